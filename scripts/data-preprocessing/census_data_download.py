@@ -19,6 +19,9 @@ def process_chunk(
     species: str,
     ids: list[int],
     chunk_n: int,
+    metadata_format: str = "pkl",
+    threads: int = 1,
+    use_gpu: bool = False,
 ):
     """
     Helper function to download and save a chunk of data.
@@ -38,6 +41,13 @@ def process_chunk(
         chunk_n (int):
             Current chunk being processes. Appended to the filename when
             its saved to disk.
+        metadata_format (str, optional):
+            File format to save the metadata in, either 'pkl' or 'parquet'.
+            Defaults to 'pkl'.
+        threads (int, optional):
+            Number of threads used to normalize the chunk. Defaults to 1.
+        use_gpu (bool, optional):
+            Normalize the chunk on the GPU with CuPy. Defaults to False.
     """
     with cellxgene_census.open_soma(census_version=CENSUS_VERSION) as census:
         adata = cellxgene_census.get_anndata(
@@ -49,12 +59,12 @@ def process_chunk(
                                     obs_coords=ids
                                 )
 
-    normalize_data(adata.X)
+    normalize_data(adata.X, n_threads=threads, use_gpu=use_gpu)
     permutation = np.random.permutation(range(adata.X.shape[0]))
     save_data_to_disk(
         data_path=os.path.join(save_dir, f'{SPECIES_MAP[species]}_counts_{chunk_n}.npz'),
         data=adata.X[permutation, :],
-        metadata_path=os.path.join(save_dir, f'{SPECIES_MAP[species]}_metadata_{chunk_n}.pkl'),
+        metadata_path=os.path.join(save_dir, f'{SPECIES_MAP[species]}_metadata_{chunk_n}.{metadata_format}'),
         metdata=adata.obs.iloc[permutation].reset_index(drop=True)
     )
 
@@ -65,6 +75,9 @@ def main(
     processes: int,
     seed: int,
     sample_size: int,
+    metadata_format: str = "pkl",
+    threads: int = 1,
+    use_gpu: bool = False,
 ):
     """
     Main downloading function for CellxGene census data.
@@ -91,6 +104,15 @@ def main(
         sample_size (int, optional):
             Number of samples to randomly grab out of the total available
             data. Defaults to None, and all available data is retrieved.
+        metadata_format (str, optional):
+            File format to save the metadata in. Parquet files can be read
+            column by column, which speeds up verification. Defaults to 'pkl'.
+        threads (int, optional):
+            Number of threads each download process uses to normalize its
+            chunk. Defaults to 1.
+        use_gpu (bool, optional):
+            Normalize each chunk on the GPU with CuPy instead. Defaults
+            to False.
     """
     if species not in VALID_SPECIES:
         raise ValueError(
@@ -129,7 +151,7 @@ def main(
             chunk_count += 1
             pool.apply_async(
                 func= process_chunk,
-                args=(directory, species, soma_ids[i:i+chunk_size], chunk_count)
+                args=(directory, species, soma_ids[i:i+chunk_size], chunk_count, metadata_format, threads, use_gpu)
             )
         pool.close()
         pool.join()
@@ -140,7 +162,8 @@ def main(
         ids= set_ids,
         expected_size= chunk_size,
         last_chunk= chunk_count, 
-        last_size= total_data % chunk_size
+        last_size= total_data % chunk_size,
+        metadata_format= metadata_format
     )
     
 if __name__ == "__main__":
@@ -184,6 +207,26 @@ if __name__ == "__main__":
         default=None, 
         help="Number of samples to grab out of total. Omit to get all data."
     )
+    parser.add_argument(
+        "--metadata_format",
+        type=str,
+        required=False,
+        default="pkl",
+        choices=["pkl", "parquet"],
+        help="File format to save the metadata in."
+    )
+    parser.add_argument(
+        "--threads",
+        type=int,
+        required=False,
+        default=1,
+        help="Number of threads each sub-process uses to normalize its data."
+    )
+    parser.add_argument(
+        "--use_gpu",
+        action="store_true",
+        help="Normalize the data on the GPU. Requires CuPy."
+    )
 
     args = parser.parse_args()
 
@@ -193,5 +236,8 @@ if __name__ == "__main__":
         chunk_size= args.chunk_size,
         processes= args.processes,
         seed= args.seed,
-        sample_size= args.sample_size
+        sample_size= args.sample_size,
+        metadata_format= args.metadata_format,
+        threads= args.threads,
+        use_gpu= args.use_gpu
     )
\ No newline at end of file
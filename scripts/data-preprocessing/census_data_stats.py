@@ -6,9 +6,9 @@ from collections import defaultdict
 import pandas as pd
 import scipy.sparse as sp
 
-from data_processing_functions import extract_file_number, gather_stats, DATA_CATEGORIES
+from data_processing_functions import extract_file_number, gather_stats, load_metadata, DATA_CATEGORIES
 
-def main(directory: os.PathLike, species: str):
+def main(directory: os.PathLike, species: str, metadata_format: str = "pkl"):
     """
     Main function for gathering stats on downloaded CellxGene Census data.
 
@@ -26,9 +26,12 @@ def main(directory: os.PathLike, species: str):
         species (str):
             The name of the species whose data is being checked. This
             is used to perform pattern matching in the directory.
+        metadata_format (str, optional):
+            File extension of the metadata files, either 'pkl' or
+            'parquet'. Defaults to 'pkl'.
     """
     data_files = glob.glob(os.path.join(directory, f"{species}*.npz"))
-    metadata_files = glob.glob(os.path.join(directory, f"{species}*.pkl"))
+    metadata_files = glob.glob(os.path.join(directory, f"{species}*.{metadata_format}"))
 
     # Sort by file number rather than filename
     data_files.sort(key=extract_file_number)
@@ -48,7 +51,7 @@ def main(directory: os.PathLike, species: str):
         filenames.append(file)
         
         data = sp.load_npz(data_path)
-        metadata = pd.read_pickle(metadata_path)
+        metadata = load_metadata(metadata_path, DATA_CATEGORIES)
         
         chunk_stats = gather_stats(data, metadata)
 
@@ -84,9 +87,18 @@ if __name__ == "__main__":
     parser.add_argument(
         "--species", type=str, required=True, help="Species to check data for."
     )
+    parser.add_argument(
+        "--metadata_format",
+        type=str,
+        required=False,
+        default="pkl",
+        choices=["pkl", "parquet"],
+        help="File format the metadata was saved in."
+    )
 
     args = parser.parse_args()
     main(
         directory= args.directory,
-        species= args.species
+        species= args.species,
+        metadata_format= args.metadata_format
     )
\ No newline at end of file
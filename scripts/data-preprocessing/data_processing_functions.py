@@ -2,15 +2,66 @@ import csv
 import glob
 import os
 import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
 
 import numpy as np
 import pandas as pd
 import scipy.sparse as sp
 
 DATA_CATEGORIES = ["assay", "cell_type", "tissue"]
+FILE_NUMBER_REGEX = re.compile(r"_(\d+)")
+
+def _row_sums(values: np.ndarray, indptr: np.ndarray):
+    """
+    Sums each row described by indptr directly from the CSR data array.
+    Empty rows sum to 0.
+    """
+    row_nnz = np.diff(indptr)
+    non_empty = row_nnz > 0
+    row_sums = np.zeros(row_nnz.size, dtype=values.dtype)
+    if non_empty.any():
+        # reduceat over the start of every non-empty row sums exactly that row
+        row_sums[non_empty] = np.add.reduceat(values, indptr[:-1][non_empty])
+    return row_sums
+
+def _normalize_rows(values: np.ndarray, indptr: np.ndarray):
+    """
+    Normalizes the rows described by indptr in-place. values is expected
+    to be a view into the data array of a CSR matrix, with indptr offset
+    so that it starts at 0.
+    """
+    row_sums = _row_sums(values, indptr)
+    row_sums[row_sums == 0] = 1
+
+    scale = np.repeat(1e4 / row_sums, np.diff(indptr))
+    np.multiply(values, scale, out=values)
+    np.log1p(values, out=values)
+
+def _normalize_rows_gpu(data: sp.csr_matrix):
+    """
+    Normalizes data in-place on the GPU using CuPy. The matrix is moved to
+    the device once, normalized there, and the result copied back.
+    """
+    import cupy as cp
+    import cupyx.scipy.sparse as cusp
+
+    gpu_data = cusp.csr_matrix(data)
+    row_sums = cp.asarray(gpu_data.sum(axis=1)).ravel()
+    row_sums[row_sums == 0] = 1
+
+    # Row of every stored value; cuSPARSE expands indptr into an int32 array
+    # and shares data/indices with gpu_data since copy=False
+    rows = gpu_data.tocoo(copy=False).row
+    cp.multiply(gpu_data.data, (1e4 / row_sums)[rows], out=gpu_data.data)
+    cp.log1p(gpu_data.data, out=gpu_data.data)
+
+    data.data[:] = gpu_data.data.get()
 
 def normalize_data(
     data: sp.csr_matrix,
+    n_threads: int = 1,
+    use_gpu: bool = False,
 ):
     """
     Function to perform normalization on the RAW counts. Each row is summed,
@@ -19,16 +70,50 @@ def normalize_data(
 
     Args:
         data (scipy.sparse.csr_matrix):
-            The data to normalize. Normalization happens in-place!
+            The floating point data to normalize. Normalization happens
+            in-place!
+        n_threads (int, optional):
+            Number of threads to split the rows across. Each thread works
+            on a disjoint slice of data.data so no locking is needed, and
+            NumPy releases the GIL for the heavy lifting. Defaults to 1.
+        use_gpu (bool, optional):
+            Perform the normalization on the GPU with CuPy instead. CuPy
+            is only imported when this is set. Defaults to False.
     """
-    for row in range(data.shape[0]):
-        start_idx = data.indptr[row]
-        end_idx = data.indptr[row + 1]
+    if not np.issubdtype(data.dtype, np.floating):
+        raise TypeError(
+            f"normalize_data requires floating point data, found {data.dtype}."
+            " Convert it first, e.g. data.data = data.data.astype(np.float32)"
+        )
+
+    if use_gpu:
+        _normalize_rows_gpu(data)
+        return
 
-        row_data = data.getrow(row).data
-        row_sum = row_data.sum()
+    indptr = data.indptr
+    n_threads = max(1, min(n_threads, data.shape[0]))
+    if n_threads == 1:
+        _normalize_rows(data.data, indptr)
+        return
 
-        data.data[start_idx:end_idx] = np.log1p((row_data * 1e4) / row_sum)
+    # Split rows so that each thread gets roughly the same number of non-zeros
+    targets = np.linspace(0, data.nnz, n_threads + 1)[1:-1]
+    bounds = np.concatenate(
+        ([0], np.searchsorted(indptr, targets), [data.shape[0]])
+    )
+    bounds = np.unique(bounds)
+
+    with ThreadPoolExecutor(max_workers=n_threads) as executor:
+        futures = [
+            executor.submit(
+                _normalize_rows,
+                data.data[indptr[start]:indptr[end]],
+                indptr[start:end + 1] - indptr[start],
+            )
+            for start, end in zip(bounds[:-1], bounds[1:])
+        ]
+        for future in futures:
+            future.result()
 
 def save_data_to_disk(
     data_path: os.PathLike,
@@ -38,17 +123,35 @@ def save_data_to_disk(
 ):
     """
     Helper function to save a pair of count data and its associated
-    metadata to disk at the provided paths.
+    metadata to disk at the provided paths. The count data is stored
+    uncompressed, which is much faster to write and read back. Metadata
+    is written as Parquet if metadata_path ends in '.parquet' and is
+    pickled otherwise.
+    """
+    sp.save_npz(data_path, data, compressed=False)
+    if str(metadata_path).endswith(".parquet"):
+        metdata.to_parquet(
+            metadata_path, engine="pyarrow", compression="zstd", index=False
+        )
+    else:
+        metdata.to_pickle(metadata_path, compression=None)
+
+def load_metadata(metadata_path: os.PathLike, columns: Optional[list[str]] = None):
+    """
+    Helper function to load metadata saved by save_data_to_disk. For
+    Parquet files only the requested columns are read from disk.
     """
-    sp.save_npz(data_path, data)
-    metdata.to_pickle(metadata_path, compression=None)
+    if str(metadata_path).endswith(".parquet"):
+        return pd.read_parquet(metadata_path, engine="pyarrow", columns=columns)
+    metadata = pd.read_pickle(metadata_path)
+    return metadata if columns is None else metadata[columns]
 
 def get_data_stats(data: sp.csr_matrix):
     """
     Helper function to get the mean and std of each file.
     """
-    row_sums = data.sum(axis=1).A.flatten()
-    return row_sums.mean(), np.std(row_sums)
+    row_sums = _row_sums(data.data, data.indptr)
+    return row_sums.mean(), row_sums.std()
 
 def gather_stats(data: sp.csr_matrix, metadata: pd.DataFrame):
     """
@@ -61,7 +164,16 @@ def gather_stats(data: sp.csr_matrix, metadata: pd.DataFrame):
     chunk_stats["std"] = std
 
     for col in DATA_CATEGORIES:
-        chunk_stats[col] = metadata[col].value_counts().to_dict()
+        values = metadata[col]
+        if not isinstance(values.dtype, pd.CategoricalDtype):
+            # Converting to categorical would hash the column anyway
+            chunk_stats[col] = values.value_counts().to_dict()
+            continue
+
+        codes = values.cat.codes.to_numpy()
+        # Missing values have code -1 and are not counted, like value_counts
+        counts = np.bincount(codes[codes >= 0], minlength=len(values.cat.categories))
+        chunk_stats[col] = dict(zip(values.cat.categories, counts.tolist()))
 
     return chunk_stats
 
@@ -69,8 +181,47 @@ def extract_file_number(filename):
     """
     Helper function to sort filenames by their file number.
     """
-    match = re.search(r"_(\d+)", filename)
-    return int(match.group(1)) if match else 0 
+    match = FILE_NUMBER_REGEX.search(filename)
+    return int(match.group(1)) if match else 0
+
+def _verify_chunk(
+    data_path: os.PathLike,
+    metadata_path: os.PathLike,
+    i: int,
+    expected_size: int,
+    last_chunk: int = None,
+    last_size: int = None,
+):
+    """
+    Checks a single data chunk for verify_data. Only the shape of the count
+    data is read, not the matrix itself. Does not touch any shared state so
+    chunks can be checked concurrently.
+
+    Returns:
+        tuple[list[str], np.ndarray]:
+            The error messages found for the chunk and its unique soma_joinids.
+    """
+    with np.load(data_path) as npz_file:
+        n_rows = npz_file["shape"][0]
+    metadata = load_metadata(metadata_path, ["soma_joinid"])
+    errors = []
+
+    if n_rows != expected_size:
+        if i != last_chunk:
+            errors.append(f"Chunk size mismatch in chunk #{i}!!!!!")
+        elif n_rows != last_size:
+            errors.append(f"Chunk size mismatch in chunk #{i}!!!!!")
+
+    soma_ids = metadata["soma_joinid"].to_numpy()
+    num_ids = soma_ids.size
+    if num_ids != n_rows:
+        errors.append(f"Metadata mismatch in chunk #{i}!!!!!")
+
+    unique_ids = np.unique(soma_ids)
+    if unique_ids.size != num_ids:
+        errors.append(f"Duplicate IDs found in chunk #{i}!!!!!")
+
+    return errors, unique_ids
 
 def verify_data(
     directory: os.PathLike,
@@ -79,6 +230,8 @@ def verify_data(
     expected_size: int,
     last_chunk: int = None,
     last_size: int = None,
+    n_workers: int = 4,
+    metadata_format: str = "pkl",
 ):
     """
     Checks that all data 'chunks' are of the expected size and that they match
@@ -100,38 +253,42 @@ def verify_data(
             chunk has a different sample size from the rest.
         last_size (int, optional):
             The expected number of samples in the last chunk.
+        n_workers (int, optional):
+            Number of threads used to check chunks concurrently. This
+            mostly helps with Parquet metadata; unpickling holds the GIL,
+            so pickled metadata gains little. Defaults to 4.
+        metadata_format (str, optional):
+            File extension of the metadata files, either 'pkl' or
+            'parquet'. Defaults to 'pkl'.
     """
     data_files = glob.glob(os.path.join(directory, f"{species}*.npz"))
-    metadata_files = glob.glob(os.path.join(directory, f"{species}*.pkl"))
+    metadata_files = glob.glob(os.path.join(directory, f"{species}*.{metadata_format}"))
     data_files.sort(key=extract_file_number)
     metadata_files.sort(key=extract_file_number)
 
-    for i, (data_path, metadata_path) in enumerate(zip(data_files, metadata_files), start=1):
-        errors_detected = False
-
-        data = sp.load_npz(data_path)
-        metadata = pd.read_pickle(metadata_path)
-
-        if data.shape[0] != expected_size:
-            if i != last_chunk:
-                print(f"Chunk size mismatch in chunk #{i}!!!!!")
-                errors_detected = True
-            elif data.shape[0] != last_size:
-                print(f"Chunk size mismatch in chunk #{i}!!!!!")
-                errors_detected = True
-        
-        soma_ids = list(metadata["soma_joinid"])
-        num_ids = len(soma_ids)
-        if num_ids != data.shape[0]:
-            print(f"Metadata mismatch in chunk #{i}!!!!!")
-            errors_detected = True
-
-        set_ids = set(soma_ids)
-        if len(set_ids) != num_ids:
-            print(f"Duplicate IDs found in chunk #{i}!!!!!")
-            errors_detected = True
-
-        ids.intersection_update(set_ids)
-
-        if not errors_detected:
-            print(f"No issues found in Chunk #{i}.")
\ No newline at end of file
+    with ThreadPoolExecutor(max_workers=max(1, n_workers)) as executor:
+        futures = [
+            executor.submit(
+                _verify_chunk,
+                data_path,
+                metadata_path,
+                i,
+                expected_size,
+                last_chunk,
+                last_size,
+            )
+            for i, (data_path, metadata_path) in enumerate(
+                zip(data_files, metadata_files), start=1
+            )
+        ]
+
+        # Report and reduce in chunk order once each chunk is done
+        for i, future in enumerate(futures, start=1):
+            errors, unique_ids = future.result()
+            for error in errors:
+                print(error)
+
+            ids.intersection_update(unique_ids.tolist())
+
+            if not errors:
+                print(f"No issues found in Chunk #{i}.")
@@ -77,6 +77,8 @@ class LoadIndexMatchedCSRMatrixAndDataFrameDataPipe(IterDataPipe):
                 with open(metadata_path, "rb") as metadata_file:
                     if ".pkl" in metadata_path:
                         metadata = pickle.load(metadata_file)
+                    elif ".parquet" in metadata_path:
+                        metadata = pd.read_parquet(metadata_file)
             except Exception as e:
                 print(f"Error loading files: {e}")
                 raise
@@ -113,13 +113,23 @@ class BaseModel(pl.LightningModule):
             if isinstance(optimizer, dict):
                 self.log_gradient_norms(optimizer, f"{tag_prefix}/{name}")
             else:
-                total_norm = 0.0
-                for group in optimizer.param_groups:
-                    for param in group["params"]:
-                        if param.grad is not None:
-                            param_norm = param.grad.data.norm(2)
-                            total_norm += param_norm.item() ** 2
-                total_norm = total_norm**0.5
+                # Keep the per-parameter norms on device and reduce them
+                # once, rather than syncing with the host for every parameter
+                param_norms = [
+                    param.grad.detach().norm(2)
+                    for group in optimizer.param_groups
+                    for param in group["params"]
+                    if param.grad is not None
+                ]
+                if param_norms:
+                    # Parameters may live on different devices, so gather the
+                    # norms on one device before reducing them
+                    device = param_norms[0].device
+                    total_norm = torch.stack(
+                        [param_norm.to(device) for param_norm in param_norms]
+                    ).norm(2)
+                else:
+                    total_norm = 0.0
                 self.log(f"{tag_prefix}/{name}", total_norm)
 
     def save_latent_predictions(
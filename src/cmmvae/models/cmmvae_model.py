@@ -216,8 +216,10 @@ class CMMVAEModel(BaseModel):
             qz, pz, x, xhats[expert_id], self.kl_annealing_fn.kl_weight
         )
 
-        main_loss_dict["Mean"] = qz.mean.mean()
-        main_loss_dict["Variance"] = qz.variance.mean()
+        # Only logged, so keep these out of the autograd graph
+        with torch.no_grad():
+            main_loss_dict["Mean"] = qz.mean.mean()
+            main_loss_dict["Variance"] = qz.variance.mean()
 
         total_loss = main_loss_dict[RK.LOSS]
 
@@ -233,7 +235,7 @@ class CMMVAEModel(BaseModel):
                     hidden_representations, expert_id, adversarial_optimizers
                 )
 
-        if adv_loss:
+        if adv_loss is not None:
             total_loss = total_loss + adv_loss * self.adv_weight
 
         # Backpropagate main loss
@@ -10,9 +10,11 @@ import subprocess
 import click
 
 
-snakemake_REGEX = (
-    r"rule (\w+):.*?" r"Submitted job (\d+)" r" with external jobid \'(\d+)\'"
+snakemake_REGEX = re.compile(
+    r"rule (\w+):.*?" r"Submitted job (\d+)" r" with external jobid \'(\d+)\'",
+    re.DOTALL,
 )
+JOB_ERR_REGEX = re.compile(r"job\.(\d+)\.err")
 
 
 def job_status(jobid: int):
@@ -36,14 +38,18 @@ def job_status(jobid: int):
     return "failed"
 
 
-def scan_file(out_file: str):
+def scan_file(out_file: str, min_interval: float = 0.05, max_interval: float = 1.0):
+    interval = min_interval
     with open(out_file, "r") as f:
         while True:
             line = f.readline()
             if line:
                 click.echo(line, nl=False)
+                interval = min_interval
             else:
-                time.sleep(1)
+                # Poll quickly while the file is active and back off when idle
+                time.sleep(interval)
+                interval = min(interval * 2, max_interval)
 
 
 def _parse_snakemake_file(log_file):
@@ -61,7 +67,7 @@ def _parse_snakemake_file(log_file):
     with open(log_file, "r") as f:
         content = f.read()
         # Regex to find all rule blocks
-        rule_blocks = re.findall(snakemake_REGEX, content, re.DOTALL)
+        rule_blocks = snakemake_REGEX.findall(content)
         # Parse just the rule ran and the rule_job_id's
         for rule, _, rule_job_id in rule_blocks:
             rules[rule] = rule_job_id
@@ -139,45 +145,60 @@ def record_view_history():
 
 
 def get_files(rule_dir, starts_with: str = "job.", ends_with: str = ".err"):
-    return [
-        f
-        for f in os.listdir(rule_dir)
-        if f.startswith(starts_with) and f.endswith(ends_with)
-    ]
+    with os.scandir(rule_dir) as entries:
+        return [
+            entry.name
+            for entry in entries
+            if entry.name.startswith(starts_with)
+            and entry.name.endswith(ends_with)
+            and entry.is_file()
+        ]
 
 
-def get_job_numbers(err_files: list[str]):
+def get_job_numbers(err_files: list[str]) -> list[int]:
     job_numbers = []
     for f in err_files:
-        matches = re.search(r"job\.(\d+)\.err", f)
+        matches = JOB_ERR_REGEX.search(f)
         if matches:
-            job_numbers.append(matches.group(1))
+            job_numbers.append(int(matches.group(1)))
     return job_numbers
 
 
-def get_last_job_id(rule_dir: str) -> Optional[str]:
-    err_files = get_files(rule_dir)
-    if not err_files:
-        return None
-
-    # Extract job numbers and find the highest
-    job_numbers = get_job_numbers(err_files)
-    last_job_number = max(job_numbers)
-
-    return last_job_number
-
-
-def get_last_n_job_ids(rule_dir: str, n: int):
-    err_files = get_files(rule_dir)
-
-    job_numbers = sorted(get_job_numbers(err_files), reverse=True)
-    return job_numbers[:n]
-
-
 class Logger:
     def __init__(self, log_dir):
         self.log_dir = log_dir
         self._view_history = []
+        # Caches keyed by path, invalidated when the path's mtime changes
+        self._job_numbers_cache: dict[str, tuple[int, list[int]]] = {}
+        self._rules_cache: dict[str, tuple[int, dict[str, str]]] = {}
+
+    def _sorted_job_numbers(self, rule_dir: str) -> list[int]:
+        # Sorted as ints so job 10 comes after job 9
+        mtime = os.stat(rule_dir).st_mtime_ns
+        cached = self._job_numbers_cache.get(rule_dir)
+        if cached is None or cached[0] != mtime:
+            job_numbers = sorted(get_job_numbers(get_files(rule_dir)), reverse=True)
+            cached = self._job_numbers_cache[rule_dir] = (mtime, job_numbers)
+        return cached[1]
+
+    def get_last_job_id(self, rule_dir: str) -> Optional[str]:
+        job_numbers = self._sorted_job_numbers(rule_dir)
+        return str(job_numbers[0]) if job_numbers else None
+
+    def get_last_n_job_ids(self, rule_dir: str, n: int) -> list[str]:
+        # Returned as strings to match the job ids parsed from snakemake logs
+        return [
+            str(job_number) for job_number in self._sorted_job_numbers(rule_dir)[:n]
+        ]
+
+    def _cached_rules(self, log_file: str) -> dict[str, str]:
+        mtime = os.stat(log_file).st_mtime_ns
+        cached = self._rules_cache.get(log_file)
+        if cached is None or cached[0] != mtime:
+            rules = _parse_snakemake_file(log_file)
+            cached = self._rules_cache[log_file] = (mtime, rules)
+        # Callers add to the returned rules, so hand out a copy
+        return dict(cached[1])
 
     def invoke_last_view(self):
         if not self._view_history:
@@ -218,9 +239,9 @@ class Logger:
 
     def parse_snakemake_file(self, snakemake_jobid: Optional[str] = None):
         snakemake_dir = self.get_path("snakemake")
-        snakemake_jobid = snakemake_jobid or get_last_job_id(snakemake_dir)
+        snakemake_jobid = snakemake_jobid or self.get_last_job_id(snakemake_dir)
         log_file = self.get_snakemake_log_file(snakemake_jobid)
-        rules = _parse_snakemake_file(log_file)
+        rules = self._cached_rules(log_file)
         rules["snakemake"] = snakemake_jobid
         return rules
 
@@ -255,7 +276,7 @@ class Logger:
     def view_history(self, n: int):
         click.echo("\n")
         snakemake_dir = self.get_path("snakemake")
-        snakemake_jobs = get_last_n_job_ids(snakemake_dir, n)
+        snakemake_jobs = self.get_last_n_job_ids(snakemake_dir, n)
 
         snakemake_job_rules = {}
         valid_results = list(snakemake_jobs)
@@ -287,7 +308,7 @@ class Logger:
     def view_snakemake(self, snakemake_jobid: Optional[str] = None):
         click.echo("\n")
         snakemake_dir = self.get_path("snakemake")
-        snakemake_jobid = snakemake_jobid or get_last_job_id(snakemake_dir)
+        snakemake_jobid = snakemake_jobid or self.get_last_job_id(snakemake_dir)
         if not snakemake_jobid:
             raise RuntimeError("snakemake_jobid is None!")
         rules = self.parse_snakemake_file(snakemake_jobid)
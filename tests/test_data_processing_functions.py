@@ -0,0 +1,108 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+import scipy.sparse as sp
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(__file__), "..", "scripts", "data-preprocessing")
+)
+from data_processing_functions import (  # noqa: E402
+    gather_stats,
+    load_metadata,
+    normalize_data,
+    save_data_to_disk,
+)
+
+
+def normalize_data_per_row(data: sp.csr_matrix):
+    # Original row-by-row implementation used as the reference
+    for row in range(data.shape[0]):
+        start_idx = data.indptr[row]
+        end_idx = data.indptr[row + 1]
+
+        row_data = data.getrow(row).data
+        row_sum = row_data.sum()
+
+        data.data[start_idx:end_idx] = np.log1p((row_data * 1e4) / row_sum)
+
+
+@pytest.fixture
+def counts():
+    data = sp.random(
+        200, 50, density=0.1, format="csr", dtype=np.float32, random_state=0
+    )
+    data.data = np.round(data.data * 10) + 1
+    # Include an empty row, including as the last row
+    data = sp.vstack([data, sp.csr_matrix((1, 50), dtype=np.float32)]).tocsr()
+    return data
+
+
+@pytest.mark.parametrize("n_threads", [1, 4])
+def test_normalize_data_matches_per_row(counts, n_threads):
+    expected = counts.copy()
+    normalize_data_per_row(expected)
+
+    normalize_data(counts, n_threads=n_threads)
+
+    assert counts.dtype == np.float32
+    np.testing.assert_allclose(counts.data, expected.data, rtol=1e-6)
+
+
+def test_normalize_data_rejects_integer_data(counts):
+    counts = counts.astype(np.int64)
+    with pytest.raises(TypeError):
+        normalize_data(counts)
+
+
+def test_normalize_data_gpu_matches_cpu(counts):
+    pytest.importorskip("cupy")
+    expected = counts.copy()
+    normalize_data(expected)
+
+    normalize_data(counts, use_gpu=True)
+
+    np.testing.assert_allclose(counts.data, expected.data, rtol=1e-5)
+
+
+def test_gather_stats_matches_value_counts(counts):
+    n = counts.shape[0]
+    rng = np.random.default_rng(0)
+    metadata = pd.DataFrame(
+        {
+            "assay": pd.Categorical(
+                rng.choice(["a", "b", None], n), categories=["a", "b", "unused"]
+            ),
+            "cell_type": rng.choice(["x", "y", None], n),
+            "tissue": pd.Series(rng.choice(["t", "u"], n), dtype="category"),
+        }
+    )
+
+    chunk_stats = gather_stats(counts, metadata)
+
+    for col in ("assay", "cell_type", "tissue"):
+        assert chunk_stats[col] == metadata[col].value_counts().to_dict()
+
+
+@pytest.mark.parametrize("extension", ["pkl", "parquet"])
+def test_save_and_load_metadata_round_trip(tmp_path, counts, extension):
+    if extension == "parquet":
+        pytest.importorskip("pyarrow")
+    metadata = pd.DataFrame(
+        {
+            "soma_joinid": np.arange(counts.shape[0]),
+            "assay": pd.Categorical(["a", "b"] * (counts.shape[0] // 2) + ["a"]),
+        }
+    )
+    data_path = str(tmp_path / "human_counts_1.npz")
+    metadata_path = str(tmp_path / f"human_metadata_1.{extension}")
+
+    save_data_to_disk(data_path, metadata_path, counts, metadata)
+
+    assert (sp.load_npz(data_path) != counts).nnz == 0
+    pd.testing.assert_frame_equal(load_metadata(metadata_path), metadata)
+    pd.testing.assert_frame_equal(
+        load_metadata(metadata_path, ["soma_joinid"]), metadata[["soma_joinid"]]
+    )
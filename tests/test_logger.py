@@ -0,0 +1,54 @@
+import os
+
+import pytest
+
+from cmmvae.runners.logger import Logger
+
+
+def touch(path):
+    with open(path, "w"):
+        pass
+
+
+@pytest.fixture
+def rule_dir(tmp_path):
+    rule_dir = tmp_path / "snakemake"
+    rule_dir.mkdir()
+    return str(rule_dir)
+
+
+def test_logger_job_id_cache_refreshes_on_new_file(rule_dir):
+    touch(os.path.join(rule_dir, "job.1.err"))
+    # Pin the directory mtime so changes to it are under the test's control
+    os.utime(rule_dir, ns=(0, 0))
+
+    logger = Logger(os.path.dirname(rule_dir))
+    assert logger.get_last_job_id(rule_dir) == "1"
+
+    # A new file with the directory mtime restored is served from the cache
+    touch(os.path.join(rule_dir, "job.2.err"))
+    os.utime(rule_dir, ns=(0, 0))
+    assert logger.get_last_job_id(rule_dir) == "1"
+
+    # Another new file changes the directory mtime and refreshes the cache
+    touch(os.path.join(rule_dir, "job.3.err"))
+    assert os.stat(rule_dir).st_mtime_ns != 0
+    assert logger.get_last_job_id(rule_dir) == "3"
+    assert logger.get_last_n_job_ids(rule_dir, 3) == ["3", "2", "1"]
+
+
+def test_logger_job_id_no_matching_files(rule_dir):
+    touch(os.path.join(rule_dir, "job.latest.err"))
+
+    logger = Logger(os.path.dirname(rule_dir))
+    assert logger.get_last_job_id(rule_dir) is None
+    assert logger.get_last_n_job_ids(rule_dir, 3) == []
+
+
+def test_logger_job_ids_sorted_numerically(rule_dir):
+    for job_id in (9, 10):
+        touch(os.path.join(rule_dir, f"job.{job_id}.err"))
+
+    logger = Logger(os.path.dirname(rule_dir))
+    assert logger.get_last_job_id(rule_dir) == "10"
+    assert logger.get_last_n_job_ids(rule_dir, 2) == ["10", "9"]